@@ -8,19 +8,56 @@ Image Denoise & Sharpen Batch Tool
 
 import os
 import sys
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from tqdm import tqdm
 
 from src.processor import ImageProcessor
 from src.utils import (
-    load_config, 
-    ensure_dir, 
-    get_image_files, 
+    load_config,
+    ensure_dir,
+    get_image_files,
+    group_images_by_size,
     print_config_summary
 )
 
 
+# 每个工作进程/线程持有的处理器实例 (由 _init_worker 初始化一次)
+# 线程局部存储: ImageProcessor内部有可变的缓冲区缓存，不能跨线程共享
+_worker_state = threading.local()
+
+
+def _init_worker(config):
+    """
+    工作进程/线程初始化: 每个worker只构建一次ImageProcessor
+
+    Args:
+        config: 配置字典
+    """
+    worker_config = dict(config)
+    # 并行模式下关闭逐张详细输出，避免多worker争抢stdout打乱进度条
+    worker_config['verbose'] = False
+    # 已经跨图片并行，OpenCV内部再开多线程会超额订阅核心
+    worker_config['threads'] = 1
+    _worker_state.processor = ImageProcessor(worker_config)
+
+
+def _process_one(args):
+    """
+    处理单张图片 (供executor.map调用)
+
+    Args:
+        args: (图片路径, 输出目录) 元组
+
+    Returns:
+        输出文件路径，失败返回None
+    """
+    image_path, output_dir = args
+    return _worker_state.processor.process_image(image_path, output_dir)
+
+
 def main():
     """主函数"""
     print("\n" + "="*60)
@@ -52,6 +89,9 @@ def main():
         return
     
     print(f"📂 找到 {len(image_files)} 张图片\n")
+
+    # 按分辨率分组: 同尺寸图片连续处理，worker的滤波缓冲区可以直接复用
+    image_files = group_images_by_size(image_files)
     
     # 创建图像处理器
     processor = ImageProcessor(config)
@@ -61,20 +101,30 @@ def main():
     fail_count = 0
     start_time = time.time()
     
-    # 批量处理图片
-    print("🚀 开始处理...\n")
-    
-    for image_path in tqdm(image_files, desc="处理进度", unit="张"):
-        output_path = processor.process_image(image_path, output_dir)
-        
+    # 并行批量处理: 每张图片相互独立，分发到所有CPU核心
+    # nlmeans 是纯C++长时间计算，用进程池；其余模式OpenCV内部会释放GIL，
+    # 用线程池即可并行，还省去了ndarray的pickle开销
+    workers = min(os.cpu_count() or 1, len(image_files))
+    denoise_mode = config.get('denoise', {}).get('mode', 'bilateral')
+    executor_cls = ProcessPoolExecutor if denoise_mode == 'nlmeans' else ThreadPoolExecutor
+
+    print(f"🚀 开始处理... (并行: {workers} workers)\n")
+
+    tasks = [(image_path, output_dir) for image_path in image_files]
+    with executor_cls(max_workers=workers,
+                      initializer=_init_worker,
+                      initargs=(config,)) as executor:
+        results = list(tqdm(
+            executor.map(_process_one, tasks, chunksize=4),
+            total=len(image_files), desc="处理进度", unit="张"
+        ))
+
+    for output_path in results:
         if output_path:
             success_count += 1
         else:
             fail_count += 1
-        
-        if config.get('verbose', True):
-            print()  # 添加空行分隔
-    
+
     # 计算处理时间
     elapsed_time = time.time() - start_time
     
@@ -2,140 +2,334 @@
 图像滤波器模块 - 降噪和锐化
 """
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import cv2
 import numpy as np
 from typing import Tuple, List
 
+from .filters_numba import unsharp_threshold_fused
+
+# 按(ksize, sigma)缓存的1D高斯核系数
+# 批量处理中sigma固定，免去每次滤波调用重算核向量
+_gaussian_kernel_cache: dict = {}
+
+
+def _get_gaussian_kernel(ksize: int, sigma: float) -> np.ndarray:
+    """
+    获取缓存的1D高斯核
+
+    Args:
+        ksize: 核长度 (奇数)
+        sigma: 标准差
+
+    Returns:
+        ksize x 1 的float32核向量
+    """
+    key = (ksize, sigma)
+    kernel = _gaussian_kernel_cache.get(key)
+    if kernel is None:
+        kernel = _gaussian_kernel_cache[key] = cv2.getGaussianKernel(
+            ksize, sigma, ktype=cv2.CV_32F)
+    return kernel
+
+
+# CUDA可用性检测 (OpenCV编译了CUDA模块且有可用GPU时为True)
+try:
+    CUDA_AVAILABLE = cv2.cuda.getCudaEnabledDeviceCount() > 0
+except (AttributeError, cv2.error):
+    CUDA_AVAILABLE = False
+
 
 class DenoiseFilter:
     """降噪滤波器类"""
-    
+
+    # GPU端缓冲区和流 (线程局部): 批量处理时跨图片复用，
+    # 省去每张图的GpuMat分配，并让上传/下载与计算在同一流中排队
+    _gpu_state = threading.local()
+
+    @staticmethod
+    def _nlmeans_denoise_cuda(image: np.ndarray,
+                             h: float,
+                             template_window_size: int,
+                             search_window_size: int) -> np.ndarray:
+        """
+        CUDA版非局部均值降噪 (GPU对NLM的逐像素块搜索有数十倍加速)
+
+        Args:
+            image: 输入彩色图像
+            h: 滤波强度
+            template_window_size: 模板窗口大小
+            search_window_size: 搜索窗口大小
+
+        Returns:
+            降噪后的图像
+        """
+        state = DenoiseFilter._gpu_state
+        if getattr(state, 'src', None) is None:
+            state.src = cv2.cuda_GpuMat()
+            state.stream = cv2.cuda_Stream()
+
+        state.src.upload(image, state.stream)
+        result = cv2.cuda.fastNlMeansDenoisingColored(
+            state.src, h, h,
+            search_window=search_window_size,
+            block_size=template_window_size,
+            stream=state.stream
+        )
+        denoised = result.download(state.stream)
+        state.stream.waitForCompletion()
+        return denoised
+
     @staticmethod
-    def gaussian_denoise(image: np.ndarray, 
-                        kernel_size: Tuple[int, int] = (5, 5), 
-                        sigma: float = 1.0) -> np.ndarray:
+    def gaussian_denoise(image: np.ndarray,
+                        kernel_size: Tuple[int, int] = (5, 5),
+                        sigma: float = 1.0,
+                        dst: np.ndarray = None) -> np.ndarray:
         """
         高斯降噪
-        
+
         Args:
             image: 输入图像
             kernel_size: 核大小 (必须是奇数)
             sigma: 标准差
-            
+            dst: 可选的预分配输出缓冲区
+
         Returns:
             降噪后的图像
         """
-        return cv2.GaussianBlur(image, kernel_size, sigma)
+        # 可分离两趟1D卷积，核系数按sigma缓存复用
+        kernel_w, kernel_h = kernel_size
+        if kernel_w > 0 and kernel_h > 0 and sigma > 0:
+            kernel_x = _get_gaussian_kernel(kernel_w, sigma)
+            kernel_y = _get_gaussian_kernel(kernel_h, sigma)
+            return cv2.sepFilter2D(image, -1, kernel_x, kernel_y, dst=dst)
+        return cv2.GaussianBlur(image, kernel_size, sigma, dst=dst)
     
     @staticmethod
-    def mean_denoise(image: np.ndarray, 
-                    kernel_size: Tuple[int, int] = (5, 5)) -> np.ndarray:
+    def mean_denoise(image: np.ndarray,
+                    kernel_size: Tuple[int, int] = (5, 5),
+                    dst: np.ndarray = None) -> np.ndarray:
         """
         均值降噪
-        
+
         Args:
             image: 输入图像
             kernel_size: 核大小
-            
+            dst: 可选的预分配输出缓冲区
+
         Returns:
             降噪后的图像
         """
-        return cv2.blur(image, kernel_size)
+        return cv2.blur(image, kernel_size, dst=dst)
     
     @staticmethod
-    def median_denoise(image: np.ndarray, 
-                      kernel_size: int = 5) -> np.ndarray:
+    def median_denoise(image: np.ndarray,
+                      kernel_size: int = 5,
+                      dst: np.ndarray = None) -> np.ndarray:
         """
         中值降噪 (对椒盐噪声效果好)
-        
+
+        ksize>=5的uint8输入走OpenCV的恒定时间直方图算法(Perreault)，
+        每像素O(1)与核大小无关；其他位深在大核下不被medianBlur支持，
+        先降到8bit滤波再还原量程，保证始终落在快速路径上
+
         Args:
             image: 输入图像
             kernel_size: 核大小 (必须是奇数)
-            
+            dst: 可选的预分配输出缓冲区
+
         Returns:
             降噪后的图像
         """
-        return cv2.medianBlur(image, kernel_size)
+        if image.dtype != np.uint8 and kernel_size > 5:
+            if image.dtype == np.uint16:
+                reduced = cv2.convertScaleAbs(image, alpha=255.0 / 65535.0)
+                filtered = cv2.medianBlur(reduced, kernel_size)
+                return filtered.astype(np.uint16) * 257
+            reduced = np.clip(image, 0, 255).astype(np.uint8)
+            return cv2.medianBlur(reduced, kernel_size).astype(image.dtype)
+
+        return cv2.medianBlur(image, kernel_size, dst=dst)
     
     @staticmethod
-    def bilateral_denoise(image: np.ndarray, 
+    def bilateral_denoise(image: np.ndarray,
                          d: int = 9,
                          sigma_color: float = 75,
-                         sigma_space: float = 75) -> np.ndarray:
+                         sigma_space: float = 75,
+                         dst: np.ndarray = None) -> np.ndarray:
         """
         双边滤波降噪 (保边降噪，效果好)
-        
+
         Args:
             image: 输入图像
             d: 像素邻域直径
             sigma_color: 颜色空间标准差
             sigma_space: 坐标空间标准差
-            
+            dst: 可选的预分配输出缓冲区
+
         Returns:
             降噪后的图像
         """
-        return cv2.bilateralFilter(image, d, sigma_color, sigma_space)
-    
+        return cv2.bilateralFilter(image, d, sigma_color, sigma_space, dst=dst)
+
+    @staticmethod
+    def bilateral_denoise_tiled(image: np.ndarray,
+                               d: int = 9,
+                               sigma_color: float = 75,
+                               sigma_space: float = 75,
+                               tile_h: int = 256,
+                               dst: np.ndarray = None) -> np.ndarray:
+        """
+        分条带并行的双边滤波 (大图优化)
+
+        按水平条带切分图像 (条带间重叠d//2像素)，分发到线程池:
+        每个条带的工作集落在单核L2缓存内，且bilateralFilter在
+        C++内部释放GIL，条带间真正并行。结果与整幅滤波一致
+
+        Args:
+            image: 输入图像
+            d: 像素邻域直径
+            sigma_color: 颜色空间标准差
+            sigma_space: 坐标空间标准差
+            tile_h: 条带高度
+            dst: 可选的预分配输出缓冲区
+
+        Returns:
+            降噪后的图像
+        """
+        h = image.shape[0]
+        if h <= tile_h * 2 or d <= 0:
+            return cv2.bilateralFilter(image, d, sigma_color, sigma_space, dst=dst)
+
+        pad = d // 2
+        out = dst if dst is not None else np.empty_like(image)
+
+        def _filter_stripe(y0: int) -> None:
+            y1 = min(y0 + tile_h, h)
+            ty0 = max(0, y0 - pad)
+            ty1 = min(h, y1 + pad)
+            stripe = cv2.bilateralFilter(image[ty0:ty1], d,
+                                         sigma_color, sigma_space)
+            out[y0:y1] = stripe[y0 - ty0:y0 - ty0 + (y1 - y0)]
+
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(_filter_stripe, range(0, h, tile_h)))
+
+        return out
+
     @staticmethod
     def nlmeans_denoise(image: np.ndarray,
                        h: float = 10,
                        template_window_size: int = 7,
-                       search_window_size: int = 21) -> np.ndarray:
+                       search_window_size: int = 21,
+                       dst: np.ndarray = None) -> np.ndarray:
         """
         非局部均值降噪 (效果最好但较慢)
-        
+
         Args:
             image: 输入图像
             h: 滤波强度
             template_window_size: 模板窗口大小
             search_window_size: 搜索窗口大小
-            
+            dst: 可选的预分配输出缓冲区
+
         Returns:
             降噪后的图像
         """
         if len(image.shape) == 3:
-            # 彩色图像
+            # 彩色图像: 有CUDA设备时走GPU路径
+            if CUDA_AVAILABLE:
+                try:
+                    return DenoiseFilter._nlmeans_denoise_cuda(
+                        image, h, template_window_size, search_window_size
+                    )
+                except cv2.error as e:
+                    print(f"  ⚠️ CUDA降噪失败，回退CPU: {str(e)}")
             return cv2.fastNlMeansDenoisingColored(
-                image, None, h, h, 
+                image, dst, h, h,
                 template_window_size, search_window_size
             )
         else:
             # 灰度图像
             return cv2.fastNlMeansDenoising(
-                image, None, h, 
+                image, dst, h,
                 template_window_size, search_window_size
             )
 
 
 class SharpenFilter:
     """锐化滤波器类"""
-    
+
+    # 默认锐化核: 单位算子 + 负拉普拉斯 (5点模板)
+    _DEFAULT_KERNEL = np.array([
+        [0, -1, 0],
+        [-1, 5, -1],
+        [0, -1, 0]
+    ], dtype=np.float32)
+
+    # 按(形状, dtype, 用途)缓存的输出缓冲区，批量处理同尺寸图片时复用
+    # (线程局部存储: 跨图片并行时各worker线程互不干扰)
+    _out_cache = threading.local()
+
+    # 最多缓存的缓冲区数量 (LRU淘汰，防止混合分辨率批量撑爆内存)
+    _MAX_CACHED_BUFFERS = 4
+
+    @classmethod
+    def _get_out_buffer(cls, image: np.ndarray, tag: str = 'out',
+                        dtype=None) -> np.ndarray:
+        """
+        获取与输入同形状的缓冲区 (缓存复用，避免每张图重新分配)
+
+        Args:
+            image: 参考图像
+            tag: 用途标签 (区分同形状的不同用途缓冲)
+            dtype: 缓冲区类型 (默认与输入相同)
+
+        Returns:
+            可写的缓冲区
+        """
+        buffers = getattr(cls._out_cache, 'buffers', None)
+        if buffers is None:
+            buffers = cls._out_cache.buffers = {}
+        dtype = image.dtype if dtype is None else np.dtype(dtype)
+        key = (image.shape, dtype.str, tag)
+        buf = buffers.pop(key, None)
+        if buf is None:
+            buf = np.empty(image.shape, dtype)
+            if len(buffers) >= cls._MAX_CACHED_BUFFERS:
+                # 淘汰最久未使用的缓冲 (dict按插入序，队首即LRU)
+                buffers.pop(next(iter(buffers)))
+        buffers[key] = buf
+        return buf
+
     @staticmethod
-    def laplacian_sharpen(image: np.ndarray, 
+    def laplacian_sharpen(image: np.ndarray,
                          strength: float = 0.5) -> np.ndarray:
         """
         拉普拉斯锐化
-        
+
+        定点化实现: int16拉普拉斯 + 饱和加权融合，
+        避免float32升格的4倍内存带宽和clip/astype两次额外遍历
+
         Args:
             image: 输入图像
             strength: 锐化强度 (0.0-2.0)
-            
+
         Returns:
             锐化后的图像
         """
-        # 转换为浮点型
-        img_float = image.astype(np.float32)
-        
-        # 应用拉普拉斯算子
-        laplacian = cv2.Laplacian(img_float, cv2.CV_32F)
-        
-        # 锐化
-        sharpened = img_float - strength * laplacian
-        
-        # 裁剪并转换回uint8
-        sharpened = np.clip(sharpened, 0, 255).astype(np.uint8)
-        
-        return sharpened
+        # int16足以容纳uint8图像的拉普拉斯响应 (缓冲区缓存复用)
+        laplacian = SharpenFilter._get_out_buffer(image, 'laplacian', np.int16)
+        cv2.Laplacian(image, cv2.CV_16S, dst=laplacian, ksize=1)
+
+        # addWeighted一次遍历完成 img - strength*lap 并饱和到uint8
+        out = SharpenFilter._get_out_buffer(image)
+        cv2.addWeighted(image, 1.0, laplacian, -strength, 0,
+                        dst=out, dtype=cv2.CV_8U)
+
+        return out
     
     @staticmethod
     def unsharp_mask(image: np.ndarray,
@@ -154,17 +348,31 @@ class SharpenFilter:
         Returns:
             锐化后的图像
         """
-        # 创建模糊版本
-        blurred = cv2.GaussianBlur(image, (0, 0), sigma)
-        
+        # 创建模糊版本: 核大小公式与GaussianBlur对8bit图的自动取值一致，
+        # 1D核按sigma缓存，sepFilter2D免去每次调用重算核系数
+        ksize = int(round(sigma * 3 * 2 + 1)) | 1
+        kernel = _get_gaussian_kernel(ksize, sigma)
+        blurred = cv2.sepFilter2D(
+            image, -1, kernel, kernel,
+            dst=SharpenFilter._get_out_buffer(image, 'blurred')
+        )
+
+        # 带阈值路径: numba可用时用融合内核单次遍历完成锐化+阈值选择
+        if threshold > 0 and unsharp_threshold_fused is not None and image.ndim == 3:
+            out = SharpenFilter._get_out_buffer(image)
+            return unsharp_threshold_fused(image, blurred,
+                                           np.float32(strength), threshold, out)
+
         # 计算锐化掩模
         sharpened = cv2.addWeighted(image, 1.0 + strength, blurred, -strength, 0)
-        
-        # 应用阈值
+
+        # 应用阈值: 低对比度区域保留原像素
+        # absdiff/compare/copyTo均为单次SIMD遍历，避免np.where的多个临时缓冲
         if threshold > 0:
-            low_contrast_mask = np.abs(image - blurred) < threshold
-            sharpened = np.where(low_contrast_mask, image, sharpened)
-        
+            diff = cv2.absdiff(image, blurred)
+            low_contrast_mask = cv2.compare(diff, threshold, cv2.CMP_LT)
+            cv2.copyTo(image, low_contrast_mask, sharpened)
+
         return sharpened
     
     @staticmethod
@@ -180,64 +388,79 @@ class SharpenFilter:
         Returns:
             锐化后的图像
         """
-        if kernel is None:
-            # 默认锐化核
-            kernel = np.array([
-                [0, -1, 0],
-                [-1, 5, -1],
-                [0, -1, 0]
-            ], dtype=np.float32)
-        
+        if kernel is None or np.array_equal(kernel, SharpenFilter._DEFAULT_KERNEL):
+            # 默认核在数学上等于 单位算子 - 拉普拉斯算子 (5点模板)，
+            # 走OpenCV专用的Laplacian分发路径，比通用filter2D少约5/9的乘法
+            laplacian = cv2.Laplacian(image, cv2.CV_16S, ksize=1)
+            return cv2.addWeighted(image, 1.0, laplacian, -1.0, 0,
+                                   dtype=cv2.CV_8U)
+
+        # 任意核: 若SVD显示核为秩1 (可分离)，用两次1D卷积代替2D卷积
+        kernel = np.asarray(kernel, dtype=np.float32)
+        if kernel.ndim == 2 and min(kernel.shape) > 1:
+            w, u, vt = cv2.SVDecomp(kernel)
+            if w[0, 0] > 0 and w[1, 0] / w[0, 0] < 1e-6:
+                scale = np.sqrt(w[0, 0])
+                kernel_y = u[:, :1] * scale
+                kernel_x = vt[:1, :].T * scale
+                return cv2.sepFilter2D(image, -1, kernel_x, kernel_y)
+
         return cv2.filter2D(image, -1, kernel)
     
     @staticmethod
-    def adaptive_sharpen(image: np.ndarray, 
-                        strength: float = 1.0) -> np.ndarray:
+    def adaptive_sharpen(image: np.ndarray,
+                        strength: float = 1.0,
+                        gray: np.ndarray = None) -> np.ndarray:
         """
         自适应锐化（基于边缘检测）
-        
+
         Args:
             image: 输入图像
             strength: 锐化强度
-            
+            gray: 可选的预计算灰度图 (省去一次全图转换)
+
         Returns:
             锐化后的图像
         """
-        # 转换为灰度图用于边缘检测
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image
-        
-        # 边缘检测
-        edges = cv2.Canny(gray, 50, 150)
-        edges = cv2.dilate(edges, None, iterations=1)
+        # 转换为灰度图用于边缘检测 (调用方已提供时直接复用)
+        if gray is None:
+            if len(image.shape) == 3:
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            else:
+                gray = image
         
+        # 边缘检测: Sobel梯度幅值阈值化。做掩模不需要Canny的
+        # 非极大值抑制和滞后阈值 (约3倍开销)，且幅值掩模天然比
+        # Canny单像素边缘更厚，也省去原先的膨胀步骤
+        grad_x = cv2.Sobel(gray, cv2.CV_16S, 1, 0, ksize=3)
+        grad_y = cv2.Sobel(gray, cv2.CV_16S, 0, 1, ksize=3)
+        magnitude = cv2.addWeighted(cv2.convertScaleAbs(grad_x), 0.5,
+                                    cv2.convertScaleAbs(grad_y), 0.5, 0)
+        _, edges = cv2.threshold(magnitude, 30, 255, cv2.THRESH_BINARY)
+
         # 在边缘区域进行锐化
         sharpened = SharpenFilter.unsharp_mask(image, sigma=1.0, strength=strength)
-        
-        # 创建边缘掩模
-        if len(image.shape) == 3:
-            edge_mask = cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR)
-        else:
-            edge_mask = edges
-        
-        # 在边缘区域应用锐化
-        edge_mask = edge_mask.astype(np.float32) / 255.0
-        result = (sharpened * edge_mask + image * (1 - edge_mask)).astype(np.uint8)
-        
+
+        # 阈值化后的Sobel掩模是二值的，浮点混合退化为按掩模选择像素:
+        # copyTo接受单通道掩模直接写入所有通道，
+        # 免去GRAY2BGR扩展和float32混合/回转的多次全图遍历
+        result = image.copy()
+        cv2.copyTo(sharpened, edges, result)
+
         return result
 
 
-def apply_denoise(image: np.ndarray, mode: str, params: dict) -> np.ndarray:
+def apply_denoise(image: np.ndarray, mode: str, params: dict,
+                  dst: np.ndarray = None) -> np.ndarray:
     """
     应用降噪滤波
-    
+
     Args:
         image: 输入图像
         mode: 降噪模式
         params: 参数字典
-        
+        dst: 可选的预分配输出缓冲区
+
     Returns:
         降噪后的图像
     """
@@ -245,45 +468,61 @@ def apply_denoise(image: np.ndarray, mode: str, params: dict) -> np.ndarray:
         return DenoiseFilter.gaussian_denoise(
             image,
             tuple(params.get('kernel_size', [5, 5])),
-            params.get('sigma', 1.0)
+            params.get('sigma', 1.0),
+            dst=dst
         )
     elif mode == 'mean':
         return DenoiseFilter.mean_denoise(
             image,
-            tuple(params.get('kernel_size', [5, 5]))
+            tuple(params.get('kernel_size', [5, 5])),
+            dst=dst
         )
     elif mode == 'median':
         return DenoiseFilter.median_denoise(
             image,
-            params.get('kernel_size', 5)
+            params.get('kernel_size', 5),
+            dst=dst
         )
     elif mode == 'bilateral':
+        # 大图走条带并行版本 (小图/分块融合中的条带不再细分)
+        if params.get('tile', True):
+            return DenoiseFilter.bilateral_denoise_tiled(
+                image,
+                params.get('d', 9),
+                params.get('sigma_color', 75),
+                params.get('sigma_space', 75),
+                dst=dst
+            )
         return DenoiseFilter.bilateral_denoise(
             image,
             params.get('d', 9),
             params.get('sigma_color', 75),
-            params.get('sigma_space', 75)
+            params.get('sigma_space', 75),
+            dst=dst
         )
     elif mode == 'nlmeans':
         return DenoiseFilter.nlmeans_denoise(
             image,
             params.get('h', 10),
             params.get('template_window_size', 7),
-            params.get('search_window_size', 21)
+            params.get('search_window_size', 21),
+            dst=dst
         )
     else:
         raise ValueError(f"不支持的降噪模式: {mode}")
 
 
-def apply_sharpen(image: np.ndarray, mode: str, params: dict) -> np.ndarray:
+def apply_sharpen(image: np.ndarray, mode: str, params: dict,
+                  gray: np.ndarray = None) -> np.ndarray:
     """
     应用锐化滤波
-    
+
     Args:
         image: 输入图像
         mode: 锐化模式
         params: 参数字典
-        
+        gray: 可选的预计算灰度图 (仅adaptive模式使用)
+
     Returns:
         锐化后的图像
     """
@@ -307,7 +546,8 @@ def apply_sharpen(image: np.ndarray, mode: str, params: dict) -> np.ndarray:
     elif mode == 'adaptive':
         return SharpenFilter.adaptive_sharpen(
             image,
-            params.get('strength', 1.0)
+            params.get('strength', 1.0),
+            gray=gray
         )
     else:
         raise ValueError(f"不支持的锐化模式: {mode}")
\ No newline at end of file
@@ -2,12 +2,17 @@
 图像处理器核心模块
 """
 
+import os
+
 import cv2
 import numpy as np
 from typing import Dict, Any, Optional
 from pathlib import Path
 
+from PIL import Image
+
 from .filters import apply_denoise, apply_sharpen
+from .turbojpeg_io import TURBOJPEG_AVAILABLE, read_jpeg, write_jpeg
 from .utils import generate_output_filename
 
 
@@ -27,7 +32,37 @@ class ImageProcessor:
         self.output_config = config.get('output', {})
         self.processing_config = config.get('processing', {})
         self.verbose = config.get('verbose', True)
-        
+
+        # 按(形状, dtype, 用途)缓存的滤波输出缓冲区 (见_get_scratch)
+        self._scratch: Dict[Any, np.ndarray] = {}
+
+        self._configure_opencv()
+
+    def _configure_opencv(self) -> None:
+        """
+        配置OpenCV的线程池和SIMD/OpenCL加速
+
+        OpenCV的滤波内核 (bilateralFilter, fastNlMeansDenoisingColored等)
+        内部通过parallel_for_多线程并行，并按CPU指令集(AVX2/NEON)分发。
+        显式开启这些开关，保证单张大图也能吃满多核。
+        跨图片并行时应在配置中设 threads: 1，避免线程超额订阅。
+        """
+        threads = self.config.get('threads', os.cpu_count() or 1)
+        cv2.setNumThreads(threads)
+        cv2.setUseOptimized(True)
+        try:
+            cv2.ocl.setUseOpenCL(True)
+        except cv2.error:
+            pass  # 无OpenCL运行时，走纯CPU路径
+
+        if self.verbose:
+            simd_lines = [line.strip() for line in cv2.getBuildInformation().splitlines()
+                          if 'CPU/HW features' in line or 'Baseline' in line]
+            print(f"  ⚙️ OpenCV线程数: {cv2.getNumThreads()}, "
+                  f"优化: {cv2.useOptimized()}")
+            for line in simd_lines[:2]:
+                print(f"     {line}")
+
     def process_image(self, image_path: str, output_dir: str) -> Optional[str]:
         """
         处理单张图像
@@ -41,7 +76,7 @@ class ImageProcessor:
         """
         try:
             # 读取图像
-            image = cv2.imread(image_path)
+            image = self._load_image(image_path)
             if image is None:
                 print(f"❌ 无法读取图像: {image_path}")
                 return None
@@ -54,13 +89,9 @@ class ImageProcessor:
             if self.processing_config.get('resize', False):
                 image = self._resize_image(image)
             
-            # 降噪处理
-            image = self._apply_denoise(image)
-            
-            # 锐化处理
-            if self.sharpen_config.get('enabled', True):
-                image = self._apply_sharpen(image)
-            
+            # 降噪 + 锐化 (可分块时融合为单次条带遍历，省去整幅中间图的DRAM往返)
+            image = self._apply_denoise_sharpen_fused(image)
+
             # 生成输出文件名
             output_path = generate_output_filename(
                 image_path,
@@ -85,6 +116,32 @@ class ImageProcessor:
             print(f"❌ 处理图像时出错 {image_path}: {str(e)}")
             return None
     
+    def _load_image(self, image_path: str) -> Optional[np.ndarray]:
+        """
+        读取图像 (JPEG走libjpeg-turbo的SIMD解码路径)
+
+        Args:
+            image_path: 输入图像路径
+
+        Returns:
+            BGR图像数组，失败返回None
+        """
+        if TURBOJPEG_AVAILABLE and Path(image_path).suffix.lower() in ('.jpg', '.jpeg'):
+            try:
+                return read_jpeg(image_path)
+            except (OSError, ValueError) as e:
+                print(f"  ⚠️ turbojpeg解码失败，回退cv2: {str(e)}")
+
+        # 一次读入字节再imdecode: 顺序大块读取让文件系统预读生效，
+        # 解码期间下一块数据已在页缓存中 (慢速/网络存储上差异明显)
+        try:
+            buf = np.fromfile(image_path, dtype=np.uint8)
+            if buf.size > 0:
+                return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+        except OSError:
+            pass
+        return cv2.imread(image_path)
+
     def _resize_image(self, image: np.ndarray) -> np.ndarray:
         """
         调整图像大小
@@ -120,6 +177,137 @@ class ImageProcessor:
         
         return resized
     
+    # 最多缓存的滤波缓冲区数量 (LRU淘汰)
+    _MAX_SCRATCH_BUFFERS = 4
+
+    def _get_scratch(self, shape: tuple, dtype, tag: str) -> np.ndarray:
+        """
+        获取可复用的滤波输出缓冲区，作为dst=传给OpenCV滤波函数
+
+        同尺寸图片的批量处理只在第一张时分配内存，
+        之后复用，省去每张图的malloc和页清零开销
+
+        Args:
+            shape: 缓冲区形状
+            dtype: 数据类型
+            tag: 用途标签 (区分同形状的不同用途缓冲)
+
+        Returns:
+            预分配的缓冲区
+        """
+        key = (shape, np.dtype(dtype).str, tag)
+        buf = self._scratch.pop(key, None)
+        if buf is None:
+            buf = np.empty(shape, dtype)
+            if len(self._scratch) >= self._MAX_SCRATCH_BUFFERS:
+                # 淘汰最久未使用的缓冲 (dict按插入序，队首即LRU)
+                self._scratch.pop(next(iter(self._scratch)))
+        self._scratch[key] = buf
+        return buf
+
+    def _denoise_radius(self) -> Optional[int]:
+        """
+        当前降噪模式的滤波半径 (用于条带重叠计算)
+
+        Returns:
+            半径像素数，不可分块的模式返回None
+        """
+        mode = self.denoise_config.get('mode', 'bilateral')
+        params = self.denoise_config.get(mode, {})
+
+        if mode in ('gaussian', 'mean'):
+            return max(tuple(params.get('kernel_size', [5, 5]))) // 2
+        elif mode == 'median':
+            return params.get('kernel_size', 5) // 2
+        elif mode == 'bilateral':
+            return params.get('d', 9) // 2
+        # nlmeans的搜索窗口跨越条带边界，不适合分块
+        return None
+
+    def _sharpen_radius(self) -> Optional[int]:
+        """
+        当前锐化模式的滤波半径 (用于条带重叠计算)
+
+        Returns:
+            半径像素数，不可分块的模式返回None
+        """
+        mode = self.sharpen_config.get('mode', 'unsharp_mask')
+        params = self.sharpen_config.get(mode, {})
+
+        if mode == 'laplacian':
+            return 1
+        elif mode == 'unsharp_mask':
+            # 高斯模糊的有效支撑约为3*sigma
+            return int(3 * params.get('sigma', 1.0)) + 1
+        elif mode == 'custom':
+            kernel = params.get('kernel', None)
+            return len(kernel) // 2 if kernel else 1
+        # adaptive是掩模生成+反锐化两级级联，组合半径的记账复杂
+        # 且未对分块验证过，保持顺序路径
+        return None
+
+    def _apply_denoise_sharpen_fused(self, image: np.ndarray) -> np.ndarray:
+        """
+        融合降噪+锐化: 按水平条带分块，同一条带连续执行两个滤波
+
+        条带数据在L2缓存中被锐化直接复用，避免整幅HxWx3中间图
+        写出再读回DRAM。条带按两个滤波半径之和向外扩展重叠区，
+        只回写有效内部，结果与顺序执行完全一致。
+
+        Args:
+            image: 输入图像
+
+        Returns:
+            处理后的图像
+        """
+        sharpen_enabled = self.sharpen_config.get('enabled', True)
+
+        denoise_radius = self._denoise_radius()
+        sharpen_radius = self._sharpen_radius() if sharpen_enabled else None
+        tile_h = self.processing_config.get('tile_height', 128)
+        h = image.shape[0]
+
+        # 不可分块的模式(nlmeans/adaptive)、未启用锐化或图太小时走顺序路径
+        if (not sharpen_enabled or denoise_radius is None
+                or sharpen_radius is None or h <= tile_h * 2):
+            image = self._apply_denoise(image)
+            if sharpen_enabled:
+                image = self._apply_sharpen(image)
+            return image
+
+        denoise_mode = self.denoise_config.get('mode', 'bilateral')
+        denoise_params = self.denoise_config.get(denoise_mode, {})
+        sharpen_mode = self.sharpen_config.get('mode', 'unsharp_mask')
+        sharpen_params = self.sharpen_config.get(sharpen_mode, {})
+
+        if self.verbose:
+            print(f"  🔧 降噪模式: {denoise_mode} + ✨ 锐化模式: {sharpen_mode} (分块融合)")
+
+        pad = denoise_radius + sharpen_radius
+        out = np.empty_like(image)
+
+        try:
+            for y0 in range(0, h, tile_h):
+                y1 = min(y0 + tile_h, h)
+                # 条带向上下扩展重叠区，保证边界像素的邻域完整
+                ty0 = max(0, y0 - pad)
+                ty1 = min(h, y1 + pad)
+
+                tile = image[ty0:ty1]
+                if not tile.flags['C_CONTIGUOUS']:
+                    tile = np.ascontiguousarray(tile)
+
+                dst = self._get_scratch(tile.shape, tile.dtype, 'tile_denoise')
+                tile = apply_denoise(tile, denoise_mode, denoise_params, dst=dst)
+                tile = apply_sharpen(tile, sharpen_mode, sharpen_params)
+
+                out[y0:y1] = tile[y0 - ty0:y0 - ty0 + (y1 - y0)]
+            return out
+        except Exception as e:
+            print(f"  ⚠️ 分块处理失败，回退顺序处理: {str(e)}")
+            image = self._apply_denoise(image)
+            return self._apply_sharpen(image)
+
     def _apply_denoise(self, image: np.ndarray) -> np.ndarray:
         """
         应用降噪
@@ -137,7 +325,8 @@ class ImageProcessor:
             print(f"  🔧 降噪模式: {mode}")
         
         try:
-            denoised = apply_denoise(image, mode, params)
+            dst = self._get_scratch(image.shape, image.dtype, 'denoise')
+            denoised = apply_denoise(image, mode, params, dst=dst)
             return denoised
         except Exception as e:
             print(f"  ⚠️ 降噪失败，使用原图: {str(e)}")
@@ -158,9 +347,16 @@ class ImageProcessor:
         
         if self.verbose:
             print(f"  ✨ 锐化模式: {mode}")
-        
+
         try:
-            sharpened = apply_sharpen(image, mode, params)
+            # adaptive模式的灰度图提前在此计算，写入复用缓冲区
+            gray = None
+            if mode == 'adaptive' and len(image.shape) == 3:
+                gray = cv2.cvtColor(
+                    image, cv2.COLOR_BGR2GRAY,
+                    dst=self._get_scratch(image.shape[:2], np.uint8, 'gray')
+                )
+            sharpened = apply_sharpen(image, mode, params, gray=gray)
             return sharpened
         except Exception as e:
             print(f"  ⚠️ 锐化失败，使用降噪后的图: {str(e)}")
@@ -179,7 +375,30 @@ class ImageProcessor:
         """
         output_format = self.output_config.get('format', 'png').lower()
         quality = self.output_config.get('quality', 95)
-        
+
+        # JPEG输出走libjpeg-turbo的SIMD编码路径
+        if TURBOJPEG_AVAILABLE and output_format in ('jpg', 'jpeg'):
+            try:
+                return write_jpeg(output_path, image, quality)
+            except (OSError, ValueError) as e:
+                print(f"  ⚠️ turbojpeg编码失败，回退cv2: {str(e)}")
+
+        # Pillow编码路径: pillow-simd环境下JPEG编码链接AVX2版libjpeg-turbo，
+        # 比OpenCV自带的libjpeg快约2倍 (普通Pillow下性能与cv2相当)
+        if output_format in ('jpg', 'jpeg', 'webp') and len(image.shape) == 3:
+            try:
+                rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                pil_image = Image.fromarray(rgb)
+                if output_format == 'webp':
+                    pil_image.save(output_path, quality=quality)
+                else:
+                    pil_image.save(output_path, quality=quality,
+                                   optimize=False, progressive=False,
+                                   subsampling=2)
+                return True
+            except (OSError, ValueError) as e:
+                print(f"  ⚠️ Pillow编码失败，回退cv2: {str(e)}")
+
         # 设置保存参数
         if output_format in ['jpg', 'jpeg']:
             params = [cv2.IMWRITE_JPEG_QUALITY, quality]
@@ -193,7 +412,10 @@ class ImageProcessor:
             params = []
         
         try:
-            success = cv2.imwrite(output_path, image, params)
+            # imencode到内存再整块写盘，编码与磁盘写出解耦
+            success, buf = cv2.imencode('.' + output_format, image, params)
+            if success:
+                buf.tofile(output_path)
             return success
         except Exception as e:
             print(f"  ⚠️ 保存图像失败: {str(e)}")
@@ -3,32 +3,59 @@
 """
 
 import os
+import pickle
 import yaml
 from pathlib import Path
 from typing import List, Dict, Any
 
+from PIL import Image
+
 
 def load_config(config_path: str = "config.yaml") -> Dict[str, Any]:
     """
     加载配置文件
-    
+
+    解析结果以pickle缓存在配置文件旁 (按mtime判断是否过期)，
+    外部工具在shell循环中反复调用main.py时省去重复的YAML解析
+
     Args:
         config_path: 配置文件路径
-        
+
     Returns:
         配置字典
     """
+    cache_path = config_path + '.pkl'
+
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-        return config
-    except FileNotFoundError:
+        yaml_mtime = os.path.getmtime(config_path)
+    except OSError:
         print(f"警告: 配置文件 {config_path} 不存在，使用默认配置")
         return get_default_config()
+
+    # 缓存未过期时直接反序列化 (比YAML解析快一个数量级)
+    try:
+        if os.path.getmtime(cache_path) >= yaml_mtime:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f)
     except yaml.YAMLError as e:
         print(f"错误: 配置文件解析失败 - {e}")
         return get_default_config()
 
+    # 写缓存失败不影响功能 (如只读目录)
+    try:
+        with open(cache_path, 'wb') as f:
+            pickle.dump(config, f)
+    except OSError:
+        pass
+
+    return config
+
 
 def get_default_config() -> Dict[str, Any]:
     """
@@ -89,22 +116,56 @@ def get_image_files(directory: str) -> List[str]:
     """
     supported_formats = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp'}
     image_files = []
-    
-    if not os.path.exists(directory):
+
+    # scandir的DirEntry.is_file复用内核返回的dirent类型，
+    # 免去listdir方式对每个文件的一次stat系统调用
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                name = entry.name
+                dot = name.rfind('.')
+                if dot >= 0 and name[dot:].lower() in supported_formats:
+                    image_files.append(entry.path)
+    except OSError:
         print(f"警告: 目录 {directory} 不存在")
         return image_files
-    
-    for file in os.listdir(directory):
-        file_path = os.path.join(directory, file)
-        if os.path.isfile(file_path):
-            ext = os.path.splitext(file)[1].lower()
-            if ext in supported_formats:
-                image_files.append(file_path)
-    
+
     return sorted(image_files)
 
 
-def generate_output_filename(input_path: str, output_dir: str, 
+def group_images_by_size(image_files: List[str]) -> List[str]:
+    """
+    按分辨率分组重排图片列表 (只读文件头，不解码像素)
+
+    同尺寸图片连续处理时，处理器按形状缓存的滤波缓冲区命中率最高；
+    不同分辨率交错会让缓冲区反复淘汰重建。PIL的Image.open是
+    惰性的，探测尺寸只需读取文件头几百字节。
+
+    Args:
+        image_files: 图片文件路径列表
+
+    Returns:
+        按分辨率分组重排后的文件列表
+    """
+    buckets: Dict[Any, List[str]] = {}
+    for path in image_files:
+        try:
+            with Image.open(path) as im:
+                key = im.size
+        except (OSError, ValueError):
+            # 无法解析文件头的留到最后，交给处理阶段报错
+            key = None
+        buckets.setdefault(key, []).append(path)
+
+    ordered = []
+    for key in sorted(buckets, key=lambda k: (k is None, k)):
+        ordered.extend(buckets[key])
+    return ordered
+
+
+def generate_output_filename(input_path: str, output_dir: str,
                             prefix: str = "processed_", 
                             output_format: str = "png",
                             keep_original_name: bool = True) -> str: